@@ -1,10 +1,18 @@
 import argparse
 import json
-import math
-import random
+import mmap
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
 
 try:
     import yfinance as yf
@@ -26,80 +34,107 @@ BAGHOLDER_TICKERS: Dict[str, Dict[str, float]] = {
     "NBIS": {"base": 12.0, "color": "#22c55e", "label": "Nebius"},
 }
 
-def _bagholder_downtrend(symbol: str, base_price: float, today: date) -> List[dict]:
+_MIDNIGHT = datetime.min.time()
+
+
+@lru_cache(maxsize=1)
+def _bagholder_dates(today: date) -> Tuple[str, ...]:
+    """Weekly ISO timestamps for the sample bagholder window, oldest first."""
+
+    return tuple(
+        datetime.combine(today - timedelta(weeks=weeks_ago), _MIDNIGHT, tzinfo=timezone.utc).isoformat()
+        for weeks_ago in range(6, -1, -1)
+    )
+
+
+def _bagholder_downtrend(symbol: str, base_price: float, today: date) -> Dict[str, list]:
     """Generate a deterministic 7-week downward series for sample output."""
 
-    series = []
-    for weeks_ago in range(6, -1, -1):
-        date = today - timedelta(weeks=weeks_ago)
-        # Steepen the decline toward ~50% over the window
-        discount = 0.05 * (6 - weeks_ago)
-        price = max(0.5, base_price * (1 - discount))
-        series.append(
-            {
-                "x": datetime.combine(date, datetime.min.time(), tzinfo=timezone.utc).isoformat(),
-                "y": round(price, 2),
-            }
-        )
-    return series
+    timestamps = _bagholder_dates(today)
+    # Steepen the decline toward ~50% over the window
+    return {
+        "x": list(timestamps),
+        "y": [round(max(0.5, base_price * (1 - 0.05 * week)), 2) for week in range(len(timestamps))],
+    }
 
 
-def _change_pct(series: List[float], days: int) -> float:
-    if len(series) <= days:
+def _change_pct(series: np.ndarray, days: int) -> float:
+    if series.size <= days:
         return 0.0
-    past = series[-(days + 1)]
-    latest = series[-1]
+    # Widen and re-round to cents so float32 storage does not leak into the percentage.
+    past, latest = np.round(series[[-(days + 1), -1]].astype(np.float64), 2)
     if past == 0:
         return 0.0
-    return round(((latest - past) / past) * 100, 2)
+    return round(float((latest - past) / past) * 100, 2)
 
 
-def _build_sample_dataset() -> dict:
-    random.seed(1337)
-    today = datetime.now(timezone.utc).date()
-    start = today - timedelta(days=365)
-
-    dataset = {
-        "lastUpdated": datetime.now(timezone.utc).isoformat(),
+def _new_dataset(metadata: dict, now: datetime) -> dict:
+    return {
+        "lastUpdated": now.isoformat(),
         "series": {},
         "sentiment": {},
-        "metadata": {
-            "source": "sample",
-            "note": "Generated offline; GitHub Actions will replace with live data when network is available.",
-        },
+        "metadata": metadata,
         "bagholders": [],
     }
 
-    for symbol, base_price in TICKERS.items():
-        prices: List[float] = []
-        timestamps: List[str] = []
-        price = base_price
 
-        for day in range(366):
-            current_date = start + timedelta(days=day)
-            seasonal = math.sin(day / 20) * 0.01
-            drift = 0.0008
-            noise = random.uniform(-0.004, 0.004)
-            price = max(1.0, price * (1 + seasonal + drift + noise))
-            prices.append(round(price, 2))
-            timestamps.append(datetime.combine(current_date, datetime.min.time(), tzinfo=timezone.utc).isoformat())
+def _pack_series(symbol: str, timestamps: List[str], prices: np.ndarray, shares: Optional[float]) -> dict:
+    # Widen (and re-round to cents) before multiplying: float32 cannot hold a market cap to the cent.
+    market_cap = round(round(float(prices[-1]), 2) * shares, 2) if shares else None
+    return {
+        "symbol": symbol,
+        "timestamps": timestamps,
+        "closes": prices,
+        "sharesOutstanding": shares,
+        "marketCap": market_cap,
+    }
 
-        shares_outstanding = 24.5e9 if symbol == "NVDA" else 10e9
-        market_cap = round(prices[-1] * shares_outstanding, 2)
-
-        dataset["series"][symbol] = {
-            "symbol": symbol,
-            "timestamps": timestamps,
-            "closes": prices,
-            "sharesOutstanding": shares_outstanding,
-            "marketCap": market_cap,
+
+def _add_sentiment(dataset: dict) -> None:
+    nvda = dataset["series"].get("NVDA")
+    if nvda:
+        dataset["sentiment"]["NVDA"] = {
+            "changePct5d": _change_pct(nvda["closes"], 5),
+            "changePct30d": _change_pct(nvda["closes"], 30),
         }
 
-        if symbol == "NVDA":
-            dataset["sentiment"][symbol] = {
-                "changePct5d": _change_pct(prices, 5),
-                "changePct30d": _change_pct(prices, 30),
-            }
+
+def _build_sample_dataset() -> dict:
+    rng = np.random.default_rng(1337)
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    start = today - timedelta(days=365)
+
+    dataset = _new_dataset(
+        {
+            "source": "sample",
+            "note": "Generated offline; GitHub Actions will replace with live data when network is available.",
+        },
+        now,
+    )
+
+    days = np.arange(366)
+    seasonal = np.sin(days / 20) * 0.01
+    drift = 0.0008
+    # Every ticker shares the same trading days, so format them once and reuse the list.
+    dates = np.datetime64(start, "D") + days.astype("timedelta64[D]")
+    timestamps: List[str] = [f"{current_date}T00:00:00+00:00" for current_date in dates]
+
+    # Draw every ticker's noise in one call; rows follow TICKERS order so output stays deterministic.
+    noise = rng.uniform(-0.004, 0.004, (len(TICKERS), days.size))
+    base_prices = np.fromiter(TICKERS.values(), dtype=float)
+    raw = base_prices[:, None] * np.cumprod(1 + seasonal + drift + noise, axis=1)
+    # Equivalent to flooring the running price at 1.0 each day: every factor is
+    # positive, so rescale by the lowest sub-1.0 point reached so far.
+    raw /= np.minimum.accumulate(np.minimum(raw, 1.0), axis=1)
+    # Cent-rounded prices fit comfortably in float32; orjson serializes the arrays natively.
+    rounded = np.round(raw, 2).astype(np.float32)
+
+    for symbol, row in zip(TICKERS, rounded):
+        shares_outstanding = 24.5e9 if symbol == "NVDA" else 10e9
+        dataset["series"][symbol] = _pack_series(symbol, timestamps, row, shares_outstanding)
+
+    _add_sentiment(dataset)
 
     for symbol, info in BAGHOLDER_TICKERS.items():
         dataset["bagholders"].append(
@@ -114,78 +149,140 @@ def _build_sample_dataset() -> dict:
     return dataset
 
 
+def _get_shares(symbol: str, ticker) -> Tuple[str, Optional[float]]:
+    try:
+        fast_info = getattr(ticker, "fast_info", None)
+        shares = None
+        if fast_info:
+            shares = getattr(fast_info, "shares_outstanding", None) or getattr(fast_info, "shares", None)
+        if not shares:
+            # .info is the slowest per-symbol request, so only fall back to it when fast_info has nothing.
+            info = getattr(ticker, "info", {}) or {}
+            shares = info.get("sharesOutstanding")
+    except Exception as exc:  # a metadata hiccup on one symbol just leaves its market cap empty
+        print(f"Could not fetch shares outstanding for {symbol}: {exc}")
+        return symbol, None
+    return symbol, shares
+
+
+def _history_closes(history, symbol: str) -> Optional[Tuple[List[str], np.ndarray]]:
+    if symbol not in history.columns.get_level_values(0):
+        return None
+    closes = history[symbol]["Close"].dropna().round(2)
+    if closes.empty:
+        return None
+
+    timestamps = [ts.to_pydatetime().replace(tzinfo=timezone.utc).isoformat() for ts in closes.index]
+    return timestamps, closes.to_numpy(dtype=np.float32)
+
+
 def _fetch_live_data() -> Optional[dict]:
     if yf is None:
         return None
 
-    dataset = {
-        "lastUpdated": datetime.now(timezone.utc).isoformat(),
-        "series": {},
-        "sentiment": {},
-        "metadata": {
-            "source": "yfinance",
-        },
-        "bagholders": [],
-    }
+    dataset = _new_dataset({"source": "yfinance"}, datetime.now(timezone.utc))
 
     all_symbols = list(TICKERS.keys()) + list(BAGHOLDER_TICKERS.keys())
 
-    for symbol in all_symbols:
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="1y", interval="1d")
-        if history.empty:
-            return None
+    # One batched request for every symbol instead of a history() round-trip per ticker.
+    history = yf.download(
+        all_symbols,
+        period="1y",
+        interval="1d",
+        group_by="ticker",
+        auto_adjust=True,
+        threads=True,
+        progress=False,
+    )
+    if history is None or history.empty:
+        return None
 
-        closes = history["Close"].dropna().round(2)
-        timestamps = [ts.to_pydatetime().replace(tzinfo=timezone.utc).isoformat() for ts in closes.index]
-        prices = closes.tolist()
+    # Prices come from the batched download; Tickers shares one session for the metadata
+    # lookups, which are independent blocking requests and so run concurrently.
+    tickers = yf.Tickers(" ".join(all_symbols)).tickers
+    with ThreadPoolExecutor(max_workers=min(16, len(all_symbols))) as executor:
+        shares_map = dict(executor.map(_get_shares, all_symbols, (tickers[symbol] for symbol in all_symbols)))
 
-        fast_info = getattr(ticker, "fast_info", None)
-        shares = None
-        if fast_info:
-            shares = getattr(fast_info, "shares_outstanding", None) or getattr(fast_info, "shares", None)
-        info = getattr(ticker, "info", {}) or {}
-        shares = shares or info.get("sharesOutstanding")
+    # A single symbol hiccuping should not throw away the rest of the live data.
+    failures = set()
+
+    for symbol in TICKERS:
+        closes = _history_closes(history, symbol)
+        if closes is None:
+            failures.add(symbol)
+            continue
+        timestamps, prices = closes
+        dataset["series"][symbol] = _pack_series(symbol, timestamps, prices, shares_map[symbol])
+
+    if len(dataset["series"]) < len(TICKERS) // 2:
+        return None
 
-        market_cap = round(prices[-1] * shares, 2) if shares else None
+    _add_sentiment(dataset)
 
-        if symbol in TICKERS:
-            dataset["series"][symbol] = {
+    for symbol, info in BAGHOLDER_TICKERS.items():
+        closes = _history_closes(history, symbol)
+        if closes is None:
+            failures.add(symbol)
+            continue
+        timestamps, prices = closes
+        dataset["bagholders"].append(
+            {
                 "symbol": symbol,
-                "timestamps": timestamps,
-                "closes": prices,
-                "sharesOutstanding": shares,
-                "marketCap": market_cap,
+                "label": info["label"],
+                "color": info["color"],
+                "data": {"x": timestamps, "y": prices},
             }
+        )
 
-            if symbol == "NVDA":
-                dataset["sentiment"][symbol] = {
-                    "changePct5d": _change_pct(prices, 5),
-                    "changePct30d": _change_pct(prices, 30),
-                }
-        else:
-            info = BAGHOLDER_TICKERS[symbol]
-            dataset["bagholders"].append(
-                {
-                    "symbol": symbol,
-                    "label": info["label"],
-                    "color": info["color"],
-                    "data": [{"x": ts, "y": price} for ts, price in zip(timestamps, prices)],
-                }
-            )
+    if failures:
+        dataset["metadata"]["partial"] = True
+        dataset["metadata"]["missing"] = sorted(failures)
 
     return dataset
 
 
-def write_dataset(dataset: dict) -> None:
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype == np.float32:
+            # str() gives the shortest float32 repr, so 140.12 does not become 140.1199951171875.
+            return [float(str(item)) for item in value]
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _write_payload(path: Path, payload: bytes) -> None:
+    """Copy payload straight into the file's pages, skipping Python's write buffer."""
+
+    with open(path, "w+b") as handle:
+        handle.truncate(len(payload))
+        try:
+            with mmap.mmap(handle.fileno(), len(payload)) as mapped:
+                mapped[:] = payload
+        except (OSError, ValueError):  # pragma: no cover - empty payload or mmap unsupported
+            handle.seek(0)
+            handle.write(payload)
+
+
+def write_dataset(dataset: dict, pretty: bool = False) -> None:
     DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
-    DATA_PATH.write_text(json.dumps(dataset, indent=2))
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        payload = orjson.dumps(dataset, option=option)
+    elif pretty:
+        payload = json.dumps(dataset, indent=2, default=_json_default).encode("utf-8")
+    else:
+        payload = json.dumps(dataset, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+    _write_payload(DATA_PATH, payload)
     print(f"Wrote {DATA_PATH} with {len(dataset['series'])} tickers")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Update cached stock data for the AI bubble tracker.")
     parser.add_argument("--demo", action="store_true", help="Force sample data generation instead of live fetch.")
+    parser.add_argument("--pretty", action="store_true", help="Indent the JSON output for easier reading.")
     args = parser.parse_args()
 
     dataset = None if not args.demo else _build_sample_dataset()
@@ -196,7 +293,7 @@ def main() -> None:
     if dataset is None:
         dataset = _build_sample_dataset()
 
-    write_dataset(dataset)
+    write_dataset(dataset, pretty=args.pretty)
 
 
 if __name__ == "__main__":